@@ -33,6 +33,7 @@ export function ChatBox({
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
+  const [sessionId, setSessionId] = useState<string | null>(null);
 
   const getEndpoint = (id: string) => {
     switch (id) {
@@ -75,15 +76,19 @@ export function ChatBox({
           headers: {
             "Content-Type": "application/json",
           },
-          body: JSON.stringify({ input: input }),
+          body: JSON.stringify({ input: input, sessionId: sessionId }),
         }
       );
 
       const data = await response.json();
+      if (data.sessionId) {
+        setSessionId(data.sessionId);
+      }
       let formattedContent = "";
       if (data.response) {
         try {
-          const parsedResponse = JSON.parse(data.response);
+          // Validated operations arrive structured in `result`
+          const parsedResponse = data.result ?? JSON.parse(data.response);
           if (parsedResponse.operation) {
             formattedContent = `
               <div class="bg-muted rounded-lg p-4 inline-block min-w-[200px] shadow-sm border-2 border-primary">
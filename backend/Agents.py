@@ -1,10 +1,15 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
 from flask_cors import CORS
 import json
+import time
 import requests
+from admission import AdmissionController, RouteClass
+from conversation_store import ConversationStore
+from llm_client import HedgedLLMClient, OpenAIProvider, LLMError, LLMTimeoutError
+from operation_schema import validate_operation, OperationValidationError
 
 # Load environment variables
 load_dotenv()
@@ -13,8 +18,170 @@ app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-def process_with_gpt(chain_context, user_input):
+FUNDS_ROUTES = {'/bnb/confirm', '/avalanche/confirm', '/reject'}
+CHAT_ROUTES = {'/bnb', '/avalanche', '/solana'}
+
+def classify_route(path):
+    """Admission class of a request path"""
+    if path in FUNDS_ROUTES:
+        return "funds"
+    if path in CHAT_ROUTES:
+        return "chat"
+    if path == '/select-chain':
+        return "routing"
+    return "other"
+
+# Per-class slots: chat and chain-selection floods (LLM-bound) are shed with
+# 429/503 as soon as their slots are full, so they never sit on a worker
+# thread that the routes moving funds need. Only the funds class queues, and
+# its queue blocks worker threads: keep ADMISSION_*_CONCURRENCY for all
+# classes plus ADMISSION_FUNDS_QUEUE below the WSGI server's worker count.
+LLM_LATENCY_TARGET = float(os.getenv('ADMISSION_LATENCY_TARGET_SECONDS', '20'))
+admission = AdmissionController([
+    RouteClass("funds", max_concurrent=int(os.getenv('ADMISSION_FUNDS_CONCURRENCY', '8')),
+               max_queue=int(os.getenv('ADMISSION_FUNDS_QUEUE', '16')), queue_timeout=30.0),
+    RouteClass("chat", max_concurrent=int(os.getenv('ADMISSION_CHAT_CONCURRENCY', '8')),
+               max_queue=0, queue_timeout=0.0, latency_target=LLM_LATENCY_TARGET),
+    RouteClass("routing", max_concurrent=int(os.getenv('ADMISSION_ROUTING_CONCURRENCY', '4')),
+               max_queue=0, queue_timeout=0.0, latency_target=LLM_LATENCY_TARGET / 2),
+    RouteClass("other", max_concurrent=4, max_queue=0, queue_timeout=0.0),
+], classify_route)
+
+@app.before_request
+def admit_request():
+    if request.method == 'OPTIONS':  # CORS preflight
+        return None
+    route_class, rejection = admission.acquire(request.path)
+    if rejection:
+        message = f"Server busy ({rejection.reason}), please retry in {rejection.retry_after}s"
+        print(f"Shedding {request.path} [{route_class.name}]: {rejection.reason}")
+        return jsonify({
+            "status": "error",
+            "message": message,
+            "response": message,
+            "retryAfter": rejection.retry_after
+        }), rejection.status, {"Retry-After": str(rejection.retry_after)}
+    g.admission = (route_class, time.monotonic())
+
+@app.teardown_request
+def release_admission(exc):
+    ticket = g.pop('admission', None)
+    if ticket:
+        route_class, started = ticket
+        admission.release(route_class, time.monotonic() - started)
+
+def build_llm_client(model, hedge_model, hedge_base_url=None, hedge_api_key=None, deadline=30.0):
+    """
+    Client for `model` plus a hedge/failover model or provider.
+
+    Failover only helps if the hedge target is a different provider
+    (`hedge_base_url`) or at least a different model; with neither set the
+    hedge re-sends to the same upstream, which cuts tail latency but gives
+    no protection against an outage.
+    """
+    providers = [OpenAIProvider(f"openai:{model}", client, model)]
+
+    if hedge_base_url:
+        hedge_client = OpenAI(api_key=hedge_api_key, base_url=hedge_base_url)
+        providers.append(OpenAIProvider(f"{hedge_base_url}:{hedge_model}", hedge_client, hedge_model))
+    else:
+        if hedge_model == model:
+            print(f"WARNING: no separate hedge provider or model configured for {model}; "
+                  f"hedged requests go to the same upstream and cannot fail over")
+        providers.append(OpenAIProvider(f"openai:{hedge_model}:hedge", client, hedge_model))
+
+    return HedgedLLMClient(
+        providers,
+        deadline=deadline,
+        default_hedge_delay=float(os.getenv('LLM_HEDGE_DELAY_SECONDS', '4'))
+    )
+
+# Large model: full answers and escalations from the fast tier
+primary_model = os.getenv('LLM_PRIMARY_MODEL', 'gpt-4')
+llm = build_llm_client(
+    primary_model,
+    os.getenv('LLM_HEDGE_MODEL', primary_model),
+    hedge_base_url=os.getenv('LLM_HEDGE_BASE_URL'),
+    hedge_api_key=os.getenv('LLM_HEDGE_API_KEY'),
+    deadline=float(os.getenv('LLM_DEADLINE_SECONDS', '30'))
+)
+
+# Small, fast model: intent extraction, chain selection and summaries.
+# Outputs that fail schema validation or report low confidence escalate to `llm`.
+TIERED_ROUTING = os.getenv('LLM_TIERED', '1') == '1'
+FAST_MIN_CONFIDENCE = float(os.getenv('LLM_FAST_MIN_CONFIDENCE', '0.7'))
+fast_model = os.getenv('LLM_FAST_MODEL', 'gpt-4o-mini')
+fast_llm = build_llm_client(
+    fast_model,
+    os.getenv('LLM_FAST_HEDGE_MODEL', fast_model),
+    hedge_base_url=os.getenv('LLM_FAST_HEDGE_BASE_URL'),
+    hedge_api_key=os.getenv('LLM_FAST_HEDGE_API_KEY'),
+    deadline=float(os.getenv('LLM_FAST_DEADLINE_SECONDS', '10'))
+)
+
+ACTION_KEYWORDS = ("transfer", "send", "stake", "swap", "liquidity")
+
+def summarize_history(previous_summary, turns):
+    """Fold older chat turns into the running conversation summary"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+    summary = (fast_llm if TIERED_ROUTING else llm).complete(
+        messages=[
+            {"role": "system", "content": (
+                "Update the running summary of a wallet assistant conversation. "
+                "Keep chains, tokens, amounts, protocols, wallet addresses and pending "
+                "operations the user referred to. Answer with the summary only."
+            )},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"}
+        ],
+        temperature=0.3,
+        max_tokens=300
+    )
+    return summary.strip()
+
+# Server-side chat history, so follow-ups like "now stake it" resolve
+conversations = ConversationStore(
+    summarizer=summarize_history,
+    max_sessions=int(os.getenv('CONVERSATION_MAX_SESSIONS', '1000')),
+    idle_ttl=int(os.getenv('CONVERSATION_IDLE_TTL', '1800')),
+    history_token_budget=int(os.getenv('CONVERSATION_TOKEN_BUDGET', '1500'))
+)
+
+def parse_operation(content, chain_context):
+    """
+    Parse an LLM reply. Returns (data, operation, errors) where `data` is the
+    decoded JSON (None for plain text) and `operation` the validated operation,
+    if the reply contained one.
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None, None, []
+    if not isinstance(data, dict) or not data.get("operation"):
+        return data, None, []
+    try:
+        return data, validate_operation(data, chain_context), []
+    except OperationValidationError as e:
+        return data, None, e.errors
+
+def fast_tier_escalation(content, chain_context, user_input):
+    """Return (operation, reason); a reason means the large model should answer instead"""
+    data, operation, errors = parse_operation(content, chain_context)
+    if errors:
+        return None, f"invalid operation ({'; '.join(errors)})"
+    if operation:
+        if operation["confidence"] is None or operation["confidence"] < FAST_MIN_CONFIDENCE:
+            return None, f"low confidence ({operation['confidence']})"
+        return operation, None
+    if any(keyword in user_input.lower() for keyword in ACTION_KEYWORDS):
+        return None, "no operation extracted from an action request"
+    return None, None
+
+def process_with_gpt(chain_context, user_input, session_id=None):
     """Process user input with GPT-4 and return structured response"""
+    if not session_id:
+        session_id = conversations.new_session_id()
+    # Keep each chain agent's history separate for the same client session
+    history_key = f"{chain_context}:{session_id}"
     
     system_prompt = f"""You are a {chain_context} blockchain expert.
     You need to respond to user's input and interact with the user.
@@ -39,29 +206,74 @@ def process_with_gpt(chain_context, user_input):
     If the operation is "add_liquidity", both token1, token2, amount and amount2 must be present.
     Possible operations: "transfer", "stake", "swap", "add_liquidity". 
     If operation is "transfer" then token2 is null and you need to add a field "wallet"
+    Every operation JSON must also include "confidence": a number from 0 to 1 saying how sure you are that the extracted fields match the user's request.
     """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ],
-            temperature=0.7
-        )
-        
-        response_content = response.choices[0].message.content
+        messages = conversations.build_messages(history_key, system_prompt, user_input)
+        response_content = None
+        operation = None
+        tier = "large"
+
+        if TIERED_ROUTING:
+            try:
+                fast_content = fast_llm.complete(messages=messages, temperature=0.3)
+                operation, reason = fast_tier_escalation(fast_content, chain_context, user_input)
+            except LLMError as e:
+                reason = f"fast model unavailable ({str(e)})"
+            if reason:
+                print(f"Escalating to {primary_model}: {reason}")
+            else:
+                response_content = fast_content
+                tier = "fast"
+
+        if response_content is None:
+            response_content = llm.complete(messages=messages, temperature=0.7)
+            data, operation, errors = parse_operation(response_content, chain_context)
+            if errors:
+                # Never hand an unvalidated operation to the client, which would
+                # offer to confirm it; reply in plain text instead
+                print(f"Operation failed validation: {'; '.join(errors)}")
+                conversations.append_turn(history_key, user_input, response_content)
+                return jsonify({
+                    "response": "I couldn't prepare a valid transaction from that request "
+                                f"({'; '.join(errors)}). Please check the details and try again.",
+                    "tier": tier,
+                    "sessionId": session_id
+                })
+
+        conversations.append_turn(history_key, user_input, response_content)
+
+        if operation:
+            # Validated operations come back structured, so clients need not re-parse
+            return jsonify({
+                "response": json.dumps(operation),
+                "result": operation,
+                "tier": tier,
+                "sessionId": session_id
+            })
         try:
             # Try to parse as JSON first
             parsed_json = json.loads(response_content)
-            return jsonify({"response": response_content})
+            return jsonify({"response": response_content, "tier": tier, "sessionId": session_id})
         except json.JSONDecodeError:
             # If not valid JSON, return as plain text response
             return jsonify({
-                "response": f"I am a {chain_context} expert. {response_content}"
+                "response": f"I am a {chain_context} expert. {response_content}",
+                "tier": tier,
+                "sessionId": session_id
             })
             
+    except LLMTimeoutError as e:
+        print(f"GPT request timed out: {str(e)}")
+        return jsonify({
+            "response": "The assistant is taking too long to respond. Please try again."
+        }), 504
+    except LLMError as e:
+        print(f"GPT unavailable: {str(e)}")
+        return jsonify({
+            "response": "The assistant is temporarily unavailable. Please try again shortly."
+        }), 503
     except Exception as e:
         print(f"Error processing GPT response: {str(e)}")
         return jsonify({
@@ -78,7 +290,7 @@ def bnb_endpoint():
     user_input = request.json['input']
     print(f"Received input: {user_input}")  # Debug print
     
-    return process_with_gpt("BNB Chain", user_input)
+    return process_with_gpt("BNB Chain", user_input, request.json.get('sessionId'))
 
 @app.route('/avalanche', methods=['POST'])
 def avalanche_endpoint():
@@ -86,7 +298,7 @@ def avalanche_endpoint():
         return jsonify({"error": "No input provided"}), 400
     
     user_input = request.json['input']
-    return process_with_gpt("Avalanche", user_input)
+    return process_with_gpt("Avalanche", user_input, request.json.get('sessionId'))
 
 @app.route('/solana', methods=['POST'])
 def solana_endpoint():
@@ -94,7 +306,7 @@ def solana_endpoint():
         return jsonify({"error": "No input provided"}), 400
     
     user_input = request.json['input']
-    return process_with_gpt("Solana", user_input)
+    return process_with_gpt("Solana", user_input, request.json.get('sessionId'))
 
 @app.route('/select-chain', methods=['POST'])
 def select_chain():
@@ -109,23 +321,26 @@ def select_chain():
     Only respond with either "BNB", "AVAX", or "SOL". If the query is generic or could apply to all, default to "BNB"."""
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_input}
-            ],
-            temperature=0.3
-        )
-        
-        chain = response.choices[0].message.content.strip().upper()
-        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input}
+        ]
+
         # Map the chain to a number
         chain_map = {
             "BNB": 1,
             "AVAX": 2,
             "SOL": 3
         }
+
+        chain = None
+        if TIERED_ROUTING:
+            try:
+                chain = fast_llm.complete(messages=messages, temperature=0.3).strip().upper()
+            except LLMError as e:
+                print(f"Fast chain selection failed: {str(e)}")
+        if chain not in chain_map:
+            chain = llm.complete(messages=messages, temperature=0.3).strip().upper()
         
         agent_id = chain_map.get(chain, 1)  # Default to BNB if response is unexpected
         
@@ -280,6 +495,16 @@ def confirm_transaction(chain):
             "message": error_msg
         }), 500
 
+@app.route('/llm/stats', methods=['GET'])
+def llm_stats():
+    """Per-provider latency percentiles, failures and hedge counts for each model tier"""
+    return jsonify({"large": llm.stats(), "fast": fast_llm.stats()})
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    """Per-route-class queue depth, in-flight requests and shed rates"""
+    return jsonify(admission.stats())
+
 @app.route('/reject', methods=['POST'])
 def reject_transaction():
     """Handle transaction rejection"""
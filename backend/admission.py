@@ -0,0 +1,126 @@
+import math
+import threading
+import time
+
+
+class RouteClass:
+    """Concurrency limit, bounded wait queue and counters for one class of routes"""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout,
+                 latency_target=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Shed with 503 when the expected time in queue + service exceeds this
+        self.latency_target = latency_target
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_overloaded = 0
+        self.service_time = None  # EWMA of request duration, seconds
+        self.condition = threading.Condition()
+
+    def estimated_latency(self):
+        """Expected queueing plus service time for a request arriving now"""
+        service = self.service_time or 0.0
+        ahead = self.queued + max(0, self.active - self.max_concurrent + 1)
+        return service * (1 + ahead / max(1, self.max_concurrent))
+
+    def snapshot(self):
+        total = self.admitted + self.shed_queue_full + self.shed_overloaded
+        shed = self.shed_queue_full + self.shed_overloaded
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "admitted": self.admitted,
+            "shedQueueFull": self.shed_queue_full,
+            "shedOverloaded": self.shed_overloaded,
+            "shedRate": shed / total if total else 0.0,
+            "serviceTime": self.service_time,
+            "estimatedLatency": self.estimated_latency()
+        }
+
+
+class Rejection:
+    """Why a request was not admitted, and when the client should retry"""
+
+    def __init__(self, status, reason, retry_after):
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class AdmissionController:
+    """
+    Admits requests per route class so that a flood in one class can't
+    starve another.
+
+    Each class has its own concurrency slots and an optional bounded wait
+    queue. When no slot is free:
+    - expected latency above the class's target -> 503 with Retry-After
+    - queue full (or the class has no queue, max_queue=0) -> 429 with Retry-After
+    - no slot within `queue_timeout` while queued -> 503 with Retry-After
+    Queued requests wait on the calling (WSGI worker) thread, so only classes
+    that must not be shed should queue; everything else should use
+    max_queue=0 and be refused immediately rather than hold a worker.
+    """
+
+    def __init__(self, classes, classify, ewma_alpha=0.2):
+        self.classes = {c.name: c for c in classes}
+        self.classify = classify
+        self.ewma_alpha = ewma_alpha
+
+    def acquire(self, path):
+        """Return (route_class, None) once admitted, or (route_class, Rejection)"""
+        route_class = self.classes[self.classify(path)]
+        with route_class.condition:
+            if route_class.active < route_class.max_concurrent and route_class.queued == 0:
+                route_class.active += 1
+                route_class.admitted += 1
+                return route_class, None
+
+            if route_class.latency_target and route_class.estimated_latency() > route_class.latency_target:
+                route_class.shed_overloaded += 1
+                return route_class, Rejection(503, "overloaded", route_class.estimated_latency())
+
+            if route_class.queued >= route_class.max_queue:
+                route_class.shed_queue_full += 1
+                reason = "queue full" if route_class.max_queue else "at capacity"
+                return route_class, Rejection(429, reason, route_class.estimated_latency())
+
+            route_class.queued += 1
+            deadline = time.monotonic() + route_class.queue_timeout
+            try:
+                while route_class.active >= route_class.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        route_class.shed_overloaded += 1
+                        return route_class, Rejection(503, "timed out in queue",
+                                                      route_class.estimated_latency())
+                    route_class.condition.wait(remaining)
+            finally:
+                route_class.queued -= 1
+
+            route_class.active += 1
+            route_class.admitted += 1
+            return route_class, None
+
+    def release(self, route_class, duration):
+        with route_class.condition:
+            route_class.active -= 1
+            if route_class.service_time is None:
+                route_class.service_time = duration
+            else:
+                route_class.service_time += self.ewma_alpha * (duration - route_class.service_time)
+            route_class.condition.notify()
+
+    def stats(self):
+        result = {}
+        for name, route_class in self.classes.items():
+            with route_class.condition:
+                result[name] = route_class.snapshot()
+        return result
@@ -0,0 +1,174 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for budgeting"""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+def _message_tokens(message):
+    # Each chat message carries a few tokens of role/format overhead
+    return estimate_tokens(message["content"]) + 4
+
+
+class ConversationSession:
+    """History of one chat session: a rolling summary plus the recent turns"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.summary = ""
+        self.turns = []
+        self.last_used = time.monotonic()
+        self.compacting = False
+
+    def history_tokens(self):
+        return sum(_message_tokens(m) for m in self.turns)
+
+    def total_tokens(self):
+        return estimate_tokens(self.summary) + self.history_tokens()
+
+
+class ConversationStore:
+    """
+    In-memory, bounded store of chat sessions.
+
+    - At most `max_sessions` sessions are kept; the least recently used one
+      is evicted when a new session would exceed that limit.
+    - Sessions idle for longer than `idle_ttl` seconds are expired.
+    - Once a session's recent turns exceed `history_token_budget`, the oldest
+      turns are folded into a running summary via `summarizer` until the
+      history is back under `low_water_tokens` (half the budget by default),
+      so the prompt sent per turn stays roughly constant in size and
+      summaries are only needed every few turns. Summarisation runs in a
+      background thread, never on the request that triggered it.
+    - `max_session_tokens` is a hard per-session cap; if summarisation is not
+      enough (or fails) the oldest turns are dropped.
+    """
+
+    def __init__(self, summarizer=None, max_sessions=1000, idle_ttl=1800,
+                 history_token_budget=1500, low_water_tokens=None,
+                 min_recent_turns=1, max_session_tokens=4000, executor=None):
+        self.summarizer = summarizer
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.history_token_budget = history_token_budget
+        self.low_water_tokens = history_token_budget // 2 if low_water_tokens is None else low_water_tokens
+        self.min_recent_turns = min_recent_turns
+        self.max_session_tokens = max_session_tokens
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarise")
+
+    def _expire_idle(self, now):
+        # Sessions are kept in LRU order, so idle ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.idle_ttl:
+                break
+            del self._sessions[session_id]
+
+    def _get_or_create(self, session_id):
+        now = time.monotonic()
+        self._expire_idle(now)
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = ConversationSession(session_id)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+
+        session.last_used = now
+        return session
+
+    def new_session_id(self):
+        return uuid.uuid4().hex
+
+    def build_messages(self, session_id, system_prompt, user_input):
+        """Return the chat messages for the next turn of `session_id`"""
+        with self._lock:
+            session = self._get_or_create(session_id)
+            summary = session.summary
+            turns = list(session.turns)
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation with this user:\n{summary}"
+            })
+        messages.extend(turns)
+        messages.append({"role": "user", "content": user_input})
+        return messages
+
+    def append_turn(self, session_id, user_input, reply):
+        """Record a completed user/assistant exchange; compaction runs in the background"""
+        with self._lock:
+            session = self._get_or_create(session_id)
+            session.turns.append({"role": "user", "content": user_input})
+            session.turns.append({"role": "assistant", "content": reply})
+            if session.compacting or session.history_tokens() <= self.history_token_budget:
+                self._enforce_cap(session)
+                return
+            session.compacting = True
+
+        self._executor.submit(self._compact, session)
+
+    def _turns_to_fold(self, session):
+        # Oldest turns whose removal brings the history under the low-water mark
+        keep = self.min_recent_turns * 2
+        remaining = session.history_tokens()
+        count = 0
+        while len(session.turns) - count > keep and remaining > self.low_water_tokens:
+            remaining -= _message_tokens(session.turns[count])
+            count += 1
+        return session.turns[:count]
+
+    def _compact(self, session):
+        try:
+            with self._lock:
+                to_fold = self._turns_to_fold(session)
+                previous_summary = session.summary
+
+            # The summariser usually calls the LLM, so it runs without the lock.
+            # Folded turns stay in the history until the new summary is ready.
+            new_summary = previous_summary
+            if to_fold and self.summarizer:
+                try:
+                    new_summary = self.summarizer(previous_summary, to_fold)
+                except Exception as e:
+                    print(f"Error summarising conversation {session.session_id}: {str(e)}")
+                    to_fold = []
+
+            with self._lock:
+                if to_fold:
+                    folded = {id(m) for m in to_fold}
+                    session.turns = [m for m in session.turns if id(m) not in folded]
+                    session.summary = new_summary or ""
+                self._enforce_cap(session)
+                session.compacting = False
+        except Exception as e:
+            print(f"Error compacting conversation {session.session_id}: {str(e)}")
+            session.compacting = False
+
+    def _enforce_cap(self, session):
+        while session.turns and session.total_tokens() > self.max_session_tokens:
+            session.turns.pop(0)
+        if session.total_tokens() > self.max_session_tokens:
+            session.summary = session.summary[-(self.max_session_tokens - 1) * 4:]
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class LLMError(Exception):
+    """Raised when no provider could answer an LLM request"""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when no provider answered before the call's deadline"""
+
+
+class OpenAIProvider:
+    """An OpenAI-compatible chat completion endpoint serving one model"""
+
+    def __init__(self, name, client, model):
+        self.name = name
+        # No SDK-level retries: HedgedLLMClient fails over and records the error
+        self.client = client.with_options(max_retries=0)
+        self.model = model
+
+    def complete(self, messages, timeout, **kwargs):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            timeout=timeout,
+            **kwargs
+        )
+        return response.choices[0].message.content
+
+
+class ProviderStats:
+    """Rolling latency window and health counters for one provider"""
+
+    def __init__(self, window=200):
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self):
+        return {
+            "samples": len(self.latencies),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutiveFailures": self.consecutive_failures,
+            "down": self.down_until > time.monotonic(),
+            "hedgesFired": self.hedges_fired,
+            "hedgeWins": self.hedge_wins
+        }
+
+
+class HedgedLLMClient:
+    """
+    Calls a list of LLM providers in priority order with a per-call deadline.
+
+    - If the first provider has not answered after its observed p95 latency
+      (clamped to [min_hedge_delay, max_hedge_delay]), a hedged request is sent
+      to the next provider and whichever answers first wins.
+    - If a provider errors, the next one is tried straight away (failover).
+    - A provider that fails `failure_threshold` times in a row is skipped for
+      `cooldown` seconds, unless every provider is down.
+    """
+
+    def __init__(self, providers, deadline=30.0, default_hedge_delay=4.0,
+                 min_hedge_delay=0.5, max_hedge_delay=15.0, min_samples=20,
+                 failure_threshold=3, cooldown=30.0, max_workers=16):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._stats = {p.name: ProviderStats() for p in self.providers}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def _ordered_providers(self):
+        now = time.monotonic()
+        with self._lock:
+            healthy = [p for p in self.providers if self._stats[p.name].down_until <= now]
+        return healthy or list(self.providers)
+
+    def _hedge_delay(self, provider):
+        with self._lock:
+            stats = self._stats[provider.name]
+            if len(stats.latencies) < self.min_samples:
+                return self.default_hedge_delay
+            p95 = stats.percentile(95)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, p95))
+
+    def _call(self, provider, messages, timeout, kwargs):
+        started = time.monotonic()
+        try:
+            result = provider.complete(messages, timeout=timeout, **kwargs)
+        except Exception:
+            with self._lock:
+                stats = self._stats[provider.name]
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= self.failure_threshold:
+                    stats.down_until = time.monotonic() + self.cooldown
+            raise
+
+        with self._lock:
+            stats = self._stats[provider.name]
+            stats.latencies.append(time.monotonic() - started)
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.down_until = 0.0
+        return result
+
+    def complete(self, messages, deadline=None, **kwargs):
+        """Return the first successful completion text for `messages`"""
+        started = time.monotonic()
+        end = started + (deadline or self.deadline)
+        candidates = self._ordered_providers()
+        primary = candidates[0]
+        hedge_at = started + self._hedge_delay(primary)
+        hedged = False
+        pending = {}
+        errors = []
+
+        def launch():
+            provider = candidates.pop(0)
+            remaining = max(0.1, end - time.monotonic())
+            future = self._executor.submit(self._call, provider, messages, remaining, kwargs)
+            pending[future] = provider
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            if now >= end:
+                break
+            wake_at = end
+            if candidates and not hedged:
+                wake_at = min(wake_at, hedge_at)
+            done, _ = wait(list(pending), timeout=max(0.0, wake_at - now),
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"LLM provider {provider.name} failed: {str(e)}")
+                    errors.append(f"{provider.name}: {str(e)}")
+                    continue
+                if hedged and provider is not primary:
+                    with self._lock:
+                        self._stats[provider.name].hedge_wins += 1
+                return result
+
+            if not done and candidates and not hedged and time.monotonic() >= hedge_at:
+                hedged = True
+                with self._lock:
+                    self._stats[candidates[0].name].hedges_fired += 1
+                launch()
+            elif not pending and candidates:
+                # Every in-flight call failed, fail over to the next provider
+                launch()
+
+        if pending:
+            raise LLMTimeoutError(f"No LLM response within {deadline or self.deadline}s")
+        raise LLMError("All LLM providers failed: " + "; ".join(errors))
+
+    def stats(self):
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self._stats.items()}
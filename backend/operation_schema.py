@@ -0,0 +1,117 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+OPERATIONS = ("transfer", "stake", "swap", "add_liquidity")
+
+# Chains without a list accept any well-formed symbol / protocol name
+CHAIN_TOKENS = {
+    "BNB Chain": {"BNB", "WBNB", "BUSD", "CAKE", "XVS"},
+    "Avalanche": {"AVAX", "USDC", "USDT"},
+}
+CHAIN_PROTOCOLS = {
+    "BNB Chain": {"LISTA", "CAKE", "XVS"},
+}
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9]{2,10}$")
+EVM_ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+SOLANA_ADDRESS_PATTERN = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
+
+
+class OperationValidationError(ValueError):
+    """Raised when an extracted operation does not match the schema"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _symbol(value, allowed, field, errors):
+    if not isinstance(value, str) or not value.strip():
+        errors.append(f"{field} is required")
+        return None
+    symbol = value.strip().upper()
+    if allowed is not None and symbol not in allowed:
+        errors.append(f"{field} {symbol} is not supported")
+    elif not SYMBOL_PATTERN.match(symbol):
+        errors.append(f"{field} {symbol} is not a valid symbol")
+    return symbol
+
+
+def _amount(value, field, errors):
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        errors.append(f"{field} must be a number")
+        return None
+    if not amount.is_finite() or amount < 0:
+        errors.append(f"{field} must be a non-negative number")
+        return None
+    # Plain decimal string for downstream services ("1E+2" -> "100", "-0" -> "0")
+    return format(abs(amount), "f")
+
+
+def _wallet(value, chain_context, errors):
+    if not isinstance(value, str) or not value.strip():
+        errors.append("wallet is required for transfers")
+        return None
+    wallet = value.strip()
+    pattern = SOLANA_ADDRESS_PATTERN if chain_context == "Solana" else EVM_ADDRESS_PATTERN
+    if not pattern.match(wallet):
+        errors.append(f"wallet {wallet} is not a valid {chain_context} address")
+    return wallet
+
+
+def validate_operation(data, chain_context):
+    """
+    Validate an operation extracted by the LLM and return it normalised
+    (upper-case symbols, string amounts, null token2 where unused).
+    Raises OperationValidationError listing every problem found.
+    """
+    if not isinstance(data, dict):
+        raise OperationValidationError(["operation must be a JSON object"])
+
+    errors = []
+    operation = str(data.get("operation", "")).strip().lower()
+    if operation not in OPERATIONS:
+        raise OperationValidationError([f"unknown operation {operation or '(missing)'}"])
+
+    tokens = CHAIN_TOKENS.get(chain_context)
+    result = {"operation": operation}
+    result["token1"] = _symbol(data.get("token1"), tokens, "token1", errors)
+    result["amount"] = _amount(data.get("amount"), "amount", errors)
+
+    if operation in ("swap", "add_liquidity"):
+        result["token2"] = _symbol(data.get("token2"), tokens, "token2", errors)
+        if result["token2"] and result["token2"] == result["token1"]:
+            errors.append("token1 and token2 must differ")
+    else:
+        result["token2"] = None
+
+    if operation == "add_liquidity":
+        result["amount2"] = _amount(data.get("amount2"), "amount2", errors)
+    if operation == "stake":
+        result["protocol"] = _symbol(data.get("protocol"), CHAIN_PROTOCOLS.get(chain_context),
+                                     "protocol", errors)
+    if operation == "transfer":
+        result["wallet"] = _wallet(data.get("wallet"), chain_context, errors)
+
+    response = data.get("response")
+    if not isinstance(response, str) or not response.strip():
+        errors.append("response is required")
+    result["response"] = response
+
+    confidence = data.get("confidence")
+    if confidence is not None:
+        try:
+            confidence = float(confidence)
+        except (TypeError, ValueError):
+            errors.append("confidence must be a number")
+            confidence = None
+        else:
+            if not 0.0 <= confidence <= 1.0:
+                errors.append("confidence must be between 0 and 1")
+    result["confidence"] = confidence
+
+    if errors:
+        raise OperationValidationError(errors)
+    return result
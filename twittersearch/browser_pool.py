@@ -0,0 +1,226 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# URL patterns blocked in pooled sessions: pages only need DOM + scripts
+BLOCKED_ASSET_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+]
+
+
+##############################
+# 1) Event-driven wait helpers
+##############################
+def to_url(target):
+    """Accept a URL or a local HTML file path (e.g. a fixture) and return a URL"""
+    if os.path.isfile(target):
+        return "file://" + os.path.abspath(target)
+    return target
+
+
+def wait_for_clickable(driver, locator, timeout=10):
+    """Return the element for `locator` as soon as it becomes clickable"""
+    return WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(locator))
+
+
+def wait_for_new_window(driver, known_handles, timeout=60):
+    """Block until a window not in `known_handles` opens (e.g. a wallet popup)"""
+    WebDriverWait(driver, timeout).until(EC.new_window_is_opened(list(known_handles)))
+    return [h for h in driver.window_handles if h not in known_handles]
+
+
+#########################
+# 2) Chrome configuration
+#########################
+def build_chrome_options(headless=True, extension_path=None, block_assets=True):
+    """Chrome options for pooled sessions: headless, no images, DOM-ready loads"""
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--no-first-run")
+    if extension_path:
+        options.add_argument(f"--load-extension={extension_path}")
+    if block_assets:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    # Return from driver.get() at DOMContentLoaded; tasks wait for what they need
+    options.page_load_strategy = "eager"
+    return options
+
+
+def start_driver(options, block_assets=True):
+    driver = webdriver.Chrome(options=options)
+    if block_assets:
+        # Fonts have no content setting, so block them (and images) at the network layer
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_ASSET_PATTERNS})
+    return driver
+
+
+#################
+# 3) Browser pool
+#################
+class BrowserPool:
+    """
+    A fixed set of warm Chrome drivers reused across tasks.
+
+    A task is any callable taking a driver as its first argument. Tasks run
+    concurrently, one per pooled driver; drivers that crash are replaced and
+    each driver is recycled after `max_tasks_per_driver` tasks.
+    """
+
+    def __init__(self, size=2, headless=True, extension_path=None,
+                 block_assets=True, max_tasks_per_driver=50, acquire_timeout=120):
+        self.size = size
+        self.block_assets = block_assets
+        self.max_tasks_per_driver = max_tasks_per_driver
+        self.acquire_timeout = acquire_timeout
+        self.options = build_chrome_options(headless, extension_path, block_assets)
+        self._idle = queue.Queue()
+        self._task_counts = {}
+        self._live = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="browser")
+        self._closed = False
+
+    def start(self):
+        """Launch all drivers up front so the first tasks don't pay cold start"""
+        futures = [self._executor.submit(self._new_driver) for _ in range(self.size)]
+        drivers, error = [], None
+        for future in futures:
+            try:
+                drivers.append(future.result())
+            except Exception as e:
+                error = e
+        if error is not None:
+            # Don't leak the browsers that did start
+            for driver in drivers:
+                self._discard(driver)
+            self._executor.shutdown(wait=False)
+            raise error
+        for driver in drivers:
+            self._idle.put(driver)
+        return self
+
+    def _new_driver(self):
+        driver = start_driver(self.options, self.block_assets)
+        with self._lock:
+            self._task_counts[id(driver)] = 0
+            self._live += 1
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            if self._task_counts.pop(id(driver), None) is not None:
+                self._live -= 1
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _acquire(self, timeout):
+        # Poll so waiters notice when the pool has lost every driver
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self._live == 0 and self._idle.empty():
+                    raise RuntimeError("No browser sessions left in the pool")
+            wait = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+            if wait <= 0:
+                raise RuntimeError(f"No browser session available within {timeout}s")
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Borrow a driver from the pool for the duration of a `with` block"""
+        driver = self._acquire(self.acquire_timeout if timeout is None else timeout)
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            self._release(driver, healthy)
+
+    def _release(self, driver, healthy, replace_attempts=2):
+        with self._lock:
+            self._task_counts[id(driver)] = self._task_counts.get(id(driver), 0) + 1
+            worn_out = self._task_counts[id(driver)] >= self.max_tasks_per_driver
+
+        if self._closed:
+            self._discard(driver)
+            return
+        if healthy and not worn_out:
+            try:
+                driver.get("about:blank")
+            except WebDriverException:
+                healthy = False
+        if not healthy or worn_out:
+            self._discard(driver)
+            driver = None
+            for attempt in range(replace_attempts):
+                try:
+                    driver = self._new_driver()
+                    break
+                except Exception as e:
+                    print(f"[ERROR] Failed to replace browser session "
+                          f"(attempt {attempt + 1}/{replace_attempts}): {str(e)}")
+            if driver is None:
+                # The pool shrinks; _acquire fails fast once it is empty
+                return
+        self._idle.put(driver)
+
+    def _run(self, task, args, kwargs):
+        with self.session() as driver:
+            return task(driver, *args, **kwargs)
+
+    def submit(self, task, *args, **kwargs):
+        """Run `task(driver, *args, **kwargs)` on a pooled driver; returns a Future"""
+        return self._executor.submit(self._run, task, args, kwargs)
+
+    def map(self, task, items, return_exceptions=False):
+        """
+        Run `task(driver, item)` for every item concurrently, in order.
+        With `return_exceptions`, a failing item yields its exception in
+        place of a result instead of aborting the whole batch.
+        """
+        futures = [self.submit(task, item) for item in items]
+        if not return_exceptions:
+            return [f.result() for f in futures]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        while not self._idle.empty():
+            self._discard(self._idle.get_nowait())
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
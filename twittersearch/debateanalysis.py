@@ -5,6 +5,9 @@ import datetime
 from collections import defaultdict
 import time
 
+from engagement_store import EngagementStore
+from thread_clustering import cluster_threads, thread_text
+
 ##############################
 # 1) Configuration Variables #
 ##############################
@@ -28,6 +31,14 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 # File containing a list of Twitter accounts (one per line).
 ACCOUNTS_FILE = "twittersearch/accounts.txt"
 
+# Columnar store of per-cycle engagement snapshots (likes, replies, retweets).
+ENGAGEMENT_FOLDER = "engagement_history"
+
+# Related threads (TF-IDF cosine similarity >= threshold) are analysed
+# together in one ChatGPT call, up to this many threads per call.
+CLUSTER_SIMILARITY_THRESHOLD = 0.25
+MAX_THREADS_PER_PROMPT = 8
+
 
 #######################################
 # 2) Build Query for Recent (10 min) Tweets
@@ -358,8 +369,97 @@ Your tasks:
         return "Error: Malformed ChatGPT response."
 
 
+##########################################################
+# 9) Analyze a Cluster of Related Conversations in One Call
+##########################################################
+def analyze_conversation_cluster(filepaths):
+    """
+    Send several related conversation files to ChatGPT in a single request.
+    Returns a dict {filepath: summary}. Threads missing from the structured
+    reply fall back to analyze_conversation_file.
+    """
+    if len(filepaths) == 1:
+        return {filepaths[0]: analyze_conversation_file(filepaths[0])}
+
+    sections = []
+    for i, filepath in enumerate(filepaths, start=1):
+        with open(filepath, "r", encoding="utf-8") as f:
+            sections.append(f"--- Thread {i} ---\n{f.read()}")
+    threads_text = "\n".join(sections)
+
+    prompt = f"""
+You are an assistant analyzing {len(filepaths)} Twitter conversations that appear to discuss related news.
+Each thread below is a chronological list of tweets (including author info).
+
+{threads_text}
+
+For each thread:
+1. Identify if there is a heated debate, mild disagreement, or a general controversy.
+2. Summarize the key points of contention or disagreement.
+3. Note any strong sentiment (anger, insults, intense disagreement, etc.) or unusual politeness.
+4. Provide a short, concise summary of the conversation's tone and content.
+
+Respond with only a JSON object in this format:
+{{
+    "shared_topic": "what the threads have in common",
+    "threads": [
+        {{"thread": 1, "verdict": "heated debate | mild disagreement | general controversy | no controversy", "summary": "..."}}
+    ]
+}}
+"""
+
+    url = "https://api.openai.com/v1/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {OPENAI_API_KEY}"
+    }
+    payload = {
+        "model": CHATGPT_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": (
+                    "You are a helpful analyst summarizing tweet conversations. "
+                    "Your answers should be short and focus on the nature of the debate."
+                )
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.7,
+        "max_tokens": 200 + 200 * len(filepaths),
+        "response_format": {"type": "json_object"}
+    }
+
+    results = {}
+    response = requests.post(url, json=payload, headers=headers)
+    if response.status_code != 200:
+        print(f"[ERROR] OpenAI API returned {response.status_code}: {response.text}")
+    else:
+        try:
+            data = json.loads(response.json()["choices"][0]["message"]["content"])
+            topic = data.get("shared_topic", "")
+            for item in data.get("threads", []):
+                index = int(item.get("thread", 0)) - 1
+                if 0 <= index < len(filepaths):
+                    results[filepaths[index]] = (
+                        f"Verdict: {item.get('verdict', 'unknown')}\n"
+                        f"Shared topic: {topic}\n"
+                        f"{item.get('summary', '')}"
+                    )
+        except Exception as e:
+            print(f"[ERROR] Parsing ChatGPT cluster response: {e}")
+
+    for filepath in filepaths:
+        if filepath not in results:
+            results[filepath] = analyze_conversation_file(filepath)
+    return results
+
+
 #####################################
-# 9) Main Orchestration
+# 10) Main Orchestration
 #####################################
 def main():
     """
@@ -367,9 +467,12 @@ def main():
     - For each account:
         1) Fetch original tweets (last 10 mins)
         2) For each tweet, fetch popular replies (≥50% likes)
-        3) Combine parent + replies => group by conversation ID
+        3) Combine parent + replies => record engagement snapshots,
+           then group by conversation ID
         4) Write conversation threads
-        5) Analyze each file with ChatGPT
+    - Cluster related threads across all accounts and analyze each
+      cluster with one ChatGPT call
+    - Report tweets whose engagement is spiking against their account's baseline
     """
     # Read accounts from file
     if not os.path.isfile(ACCOUNTS_FILE):
@@ -383,6 +486,10 @@ def main():
         print("[ERROR] No accounts found in accounts.txt.")
         return
 
+    engagement = EngagementStore(ENGAGEMENT_FOLDER)
+    cycle_ts = time.time()
+    all_conv_files = []
+
     for username in accounts:
         print(f"\n=== Processing @{username} ===")
 
@@ -399,20 +506,42 @@ def main():
             popular_replies = fetch_popular_replies_for_tweet(tw)
             combined_tweets.extend(popular_replies)
 
+        engagement.append_snapshots(username, combined_tweets, ts=cycle_ts)
+
         # 3) Group all (parent + replies) by conversation
         conv_map = group_tweets_by_conversation(combined_tweets)
 
         # 4) Write to separate files
-        conv_files = write_threads_to_files(username, conv_map)
+        all_conv_files.extend(write_threads_to_files(username, conv_map))
+
+    # 5) Group related threads across accounts, then analyze each group with ChatGPT
+    thread_texts = []
+    for cfile in all_conv_files:
+        with open(cfile, "r", encoding="utf-8") as f:
+            thread_texts.append(thread_text(f.read()))
+    clusters = cluster_threads(
+        thread_texts,
+        threshold=CLUSTER_SIMILARITY_THRESHOLD,
+        max_cluster_size=MAX_THREADS_PER_PROMPT
+    )
+    print(f"\n[ANALYSIS] {len(all_conv_files)} conversation(s) in {len(clusters)} cluster(s).")
 
-        # 5) Analyze each file with ChatGPT
-        for cfile in conv_files:
+    for cluster in clusters:
+        cluster_files = [all_conv_files[i] for i in cluster]
+        summaries = analyze_conversation_cluster(cluster_files)
+        for cfile in cluster_files:
             print(f"\n[ANALYSIS] Conversation file: {cfile}")
-            summary = analyze_conversation_file(cfile)
             print("\n=== ChatGPT Summary ===")
-            print(summary)
+            print(summaries[cfile])
             print("=======================\n")
 
+    # 6) Engagement spikes across all watched accounts
+    for spike in engagement.detect_spikes():
+        print(
+            f"[SPIKE] @{spike['account']} tweet {spike['tweet_id']}: "
+            f"{spike['velocity']:.1f} likes/min (z={spike['z_score']:.1f})"
+        )
+
 
 if __name__ == "__main__":
     main()
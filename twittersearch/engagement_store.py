@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# One append-only binary file per column; row i of every column is one
+# engagement snapshot (a tweet's counters as seen in one polling cycle).
+COLUMNS = {
+    "ts": np.float64,           # snapshot time, unix seconds
+    "account": np.int32,        # index into accounts.json
+    "tweet_id": np.int64,
+    "conversation_id": np.int64,
+    "like_count": np.int64,
+    "reply_count": np.int64,
+    "retweet_count": np.int64,
+    "is_reply": np.int8,
+}
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class EngagementStore:
+    """
+    Columnar, append-only store of engagement snapshots for watched accounts.
+
+    Columns are raw native-endian arrays on disk, read back with np.memmap so
+    queries only touch the columns they need and never rescan text files.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self._accounts_path = os.path.join(folder, "accounts.json")
+        self._lock = threading.Lock()
+        self.accounts = []
+        if os.path.isfile(self._accounts_path):
+            with open(self._accounts_path, "r", encoding="utf-8") as f:
+                self.accounts = json.load(f)
+        self._account_index = {name: i for i, name in enumerate(self.accounts)}
+
+    def _column_path(self, name):
+        return os.path.join(self.folder, f"{name}.bin")
+
+    def _account_id(self, username):
+        if username not in self._account_index:
+            self._account_index[username] = len(self.accounts)
+            self.accounts.append(username)
+            with open(self._accounts_path, "w", encoding="utf-8") as f:
+                json.dump(self.accounts, f)
+        return self._account_index[username]
+
+    def __len__(self):
+        path = self._column_path("ts")
+        if not os.path.isfile(path):
+            return 0
+        return os.path.getsize(path) // np.dtype(COLUMNS["ts"]).itemsize
+
+    def _truncate_partial_rows(self):
+        # A crash mid-append can leave some columns longer than others;
+        # cut them back to the last complete row before appending again.
+        lengths = {}
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            size = os.path.getsize(path) if os.path.isfile(path) else 0
+            lengths[name] = size // np.dtype(dtype).itemsize
+        rows = min(lengths.values())
+        for name, dtype in COLUMNS.items():
+            if lengths[name] > rows:
+                with open(self._column_path(name), "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+
+    ####################
+    # Writing snapshots
+    ####################
+    def append_snapshots(self, username, tweets, ts=None):
+        """Append one snapshot row per tweet for `username`; returns rows written"""
+        if not tweets:
+            return 0
+        ts = time.time() if ts is None else ts
+
+        # A tweet can come back more than once per cycle (e.g. as a parent and
+        # in its replies query); keep its last occurrence only
+        latest = {}
+        for tw in tweets:
+            latest[_to_int(tw.get("id"))] = tw
+        tweets = list(latest.values())
+
+        tweet_ids = np.array([_to_int(tw.get("id")) for tw in tweets], dtype=np.int64)
+        conversation_ids = np.array(
+            [_to_int(tw.get("conversation_id") or tw.get("id")) for tw in tweets], dtype=np.int64
+        )
+        rows = {
+            "ts": np.full(len(tweets), ts, dtype=np.float64),
+            "tweet_id": tweet_ids,
+            "conversation_id": conversation_ids,
+            "like_count": np.array([_to_int(tw.get("like_count")) for tw in tweets], dtype=np.int64),
+            "reply_count": np.array([_to_int(tw.get("reply_count")) for tw in tweets], dtype=np.int64),
+            "retweet_count": np.array([_to_int(tw.get("retweet_count")) for tw in tweets], dtype=np.int64),
+            "is_reply": (tweet_ids != conversation_ids).astype(np.int8),
+        }
+
+        with self._lock:
+            rows["account"] = np.full(len(tweets), self._account_id(username), dtype=np.int32)
+            self._truncate_partial_rows()
+            for name, dtype in COLUMNS.items():
+                with open(self._column_path(name), "ab") as f:
+                    rows[name].astype(dtype).tofile(f)
+        return len(tweets)
+
+    ###########
+    # Reading
+    ###########
+    def load(self, columns=None, since=None, account=None):
+        """
+        Return {column: array} for the requested columns, optionally limited
+        to snapshots taken at or after `since` and/or for one account.
+        """
+        columns = list(columns or COLUMNS)
+        needed = set(columns) | ({"ts"} if since is not None else set()) | \
+            ({"account"} if account is not None else set())
+
+        arrays = {}
+        for name in needed:
+            path = self._column_path(name)
+            if not os.path.isfile(path) or os.path.getsize(path) == 0:
+                arrays[name] = np.empty(0, dtype=COLUMNS[name])
+            else:
+                arrays[name] = np.memmap(path, dtype=COLUMNS[name], mode="r")
+        length = min(len(a) for a in arrays.values())
+
+        mask = np.ones(length, dtype=bool)
+        if since is not None:
+            mask &= arrays["ts"][:length] >= since
+        if account is not None:
+            if account not in self._account_index:
+                mask[:] = False
+            else:
+                mask &= arrays["account"][:length] == self._account_index[account]
+
+        return {name: np.asarray(arrays[name][:length][mask]) for name in columns}
+
+    ######################
+    # Vectorized queries
+    ######################
+    def _pair_velocities(self, since=None, account=None):
+        """
+        Like velocity (likes per minute) between every pair of consecutive
+        snapshots of the same tweet. Returns (tweet_ids, account_ids,
+        velocities, is_latest) where is_latest marks each tweet's newest pair.
+        """
+        data = self.load(["ts", "tweet_id", "account", "like_count"], since=since, account=account)
+        order = np.lexsort((data["ts"], data["tweet_id"]))
+        tweet_ids = data["tweet_id"][order]
+        ts = data["ts"][order]
+        likes = data["like_count"][order]
+        accounts = data["account"][order]
+
+        # Rows with the same tweet and timestamp (duplicates from one cycle)
+        # would form zero-duration pairs; keep only the last of each
+        distinct = np.ones(len(tweet_ids), dtype=bool)
+        distinct[:-1] = (tweet_ids[1:] != tweet_ids[:-1]) | (ts[1:] != ts[:-1])
+        tweet_ids, ts, likes, accounts = (
+            tweet_ids[distinct], ts[distinct], likes[distinct], accounts[distinct]
+        )
+
+        same_tweet = tweet_ids[1:] == tweet_ids[:-1]
+        current = np.flatnonzero(same_tweet) + 1
+        previous = current - 1
+        group_end = np.append(~same_tweet, True)
+
+        minutes = np.maximum((ts[current] - ts[previous]) / 60.0, 1e-9)
+        velocity = (likes[current] - likes[previous]) / minutes
+        return tweet_ids[current], accounts[current], velocity, group_end[current]
+
+    def _baseline_stats(self, accounts, velocity):
+        n = len(self.accounts)
+        counts = np.bincount(accounts, minlength=n)
+        safe = np.maximum(counts, 1)
+        means = np.bincount(accounts, weights=velocity, minlength=n) / safe
+        squares = np.bincount(accounts, weights=velocity ** 2, minlength=n) / safe
+        stds = np.sqrt(np.maximum(squares - means ** 2, 0.0))
+        return counts, means, stds
+
+    def engagement_velocity(self, since=None, account=None):
+        """
+        Likes per minute for each tweet between its two most recent snapshots.
+        Returns (tweet_ids, account_ids, velocities); tweets with a single
+        snapshot are omitted.
+        """
+        tweet_ids, accounts, velocity, latest = self._pair_velocities(since, account)
+        return tweet_ids[latest], accounts[latest], velocity[latest]
+
+    def account_baselines(self, since=None):
+        """
+        Per-account mean and standard deviation of like velocity over every
+        snapshot pair except each tweet's newest one.
+        Returns {username: {"mean": float, "std": float, "samples": int}}.
+        """
+        _, accounts, velocity, latest = self._pair_velocities(since)
+        counts, means, stds = self._baseline_stats(accounts[~latest], velocity[~latest])
+        return {
+            self.accounts[i]: {"mean": float(means[i]), "std": float(stds[i]), "samples": int(counts[i])}
+            for i in np.flatnonzero(counts)
+        }
+
+    def detect_spikes(self, z_threshold=3.0, min_velocity=1.0, min_samples=3, since=None):
+        """
+        Tweets whose latest like velocity is more than `z_threshold` standard
+        deviations above their account's historical baseline. Accounts with
+        fewer than `min_samples` historical pairs are skipped. Returns a list
+        of dicts, fastest first.
+        """
+        tweet_ids, accounts, velocity, latest = self._pair_velocities(since)
+        counts, means, stds = self._baseline_stats(accounts[~latest], velocity[~latest])
+        tweet_ids, accounts, velocity = tweet_ids[latest], accounts[latest], velocity[latest]
+
+        z = (velocity - means[accounts]) / np.maximum(stds[accounts], 1e-9)
+        hits = np.flatnonzero(
+            (z > z_threshold) & (velocity >= min_velocity) & (counts[accounts] >= min_samples)
+        )
+        hits = hits[np.argsort(-velocity[hits])]
+        return [
+            {
+                "account": self.accounts[accounts[i]],
+                "tweet_id": int(tweet_ids[i]),
+                "velocity": float(velocity[i]),
+                "z_score": float(z[i]),
+            }
+            for i in hits
+        ]
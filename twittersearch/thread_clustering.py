@@ -0,0 +1,111 @@
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[#@$]?[a-z0-9][a-z0-9_']+")
+URL_PATTERN = re.compile(r"https?://\S+")
+
+STOP_WORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "your", "all", "any", "can",
+    "had", "her", "was", "one", "our", "out", "has", "have", "him", "his", "how",
+    "its", "it's", "may", "new", "now", "see", "two", "who", "did", "get", "got",
+    "let", "say", "she", "too", "use", "that", "this", "with", "from", "they",
+    "them", "then", "than", "there", "their", "what", "when", "will", "just",
+    "been", "were", "more", "some", "very", "about", "would", "could", "should",
+    "into", "like", "also", "only", "over", "such", "much", "don't", "i'm",
+    "rt", "amp",
+}
+
+# Header lines written by write_threads_to_files, not part of the tweet text
+THREAD_HEADER_PREFIXES = ("TweetID:", "Author:", "Time:", "Likes:")
+
+
+def thread_text(convo_text):
+    """Strip per-tweet header lines from a conversation file's content"""
+    return "\n".join(
+        line for line in convo_text.splitlines()
+        if not line.startswith(THREAD_HEADER_PREFIXES)
+    )
+
+
+def tokenize(text):
+    text = URL_PATTERN.sub(" ", text.lower())
+    return [t for t in TOKEN_PATTERN.findall(text) if t not in STOP_WORDS]
+
+
+def tfidf_matrix(documents, max_features=5000):
+    """
+    L2-normalised TF-IDF matrix (documents x terms) with sublinear term
+    frequency, built in one vectorized pass over all documents.
+    """
+    tokenized = [tokenize(doc) for doc in documents]
+    doc_freq = {}
+    for tokens in tokenized:
+        for token in set(tokens):
+            doc_freq[token] = doc_freq.get(token, 0) + 1
+
+    # Keep the most widespread terms; with few documents that is all of them
+    vocab = sorted(doc_freq, key=lambda t: (-doc_freq[t], t))[:max_features]
+    index = {term: i for i, term in enumerate(vocab)}
+
+    rows = [i for i, tokens in enumerate(tokenized) for t in tokens if t in index]
+    cols = [index[t] for tokens in tokenized for t in tokens if t in index]
+    counts = np.zeros((len(documents), len(vocab)), dtype=np.float64)
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+
+    df = np.array([doc_freq[t] for t in vocab], dtype=np.float64)
+    idf = np.log((1.0 + len(documents)) / (1.0 + df)) + 1.0
+    tf = np.zeros_like(counts)
+    np.log(counts, out=tf, where=counts > 0)
+    tf[counts > 0] += 1.0
+
+    matrix = tf * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def cluster_threads(documents, threshold=0.25, max_cluster_size=8):
+    """
+    Group related documents by TF-IDF cosine similarity.
+
+    Pairs are merged greedily from most to least similar while their
+    similarity is at least `threshold` and the merged group stays within
+    `max_cluster_size` (so one cluster fits in a single prompt).
+    Returns a list of clusters, each a list of document indices.
+    """
+    n = len(documents)
+    if n == 0:
+        return []
+    if n == 1:
+        return [[0]]
+
+    matrix = tfidf_matrix(documents)
+    similarity = matrix @ matrix.T
+    first, second = np.triu_indices(n, k=1)
+    scores = similarity[first, second]
+    keep = scores >= threshold
+    first, second, scores = first[keep], second[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+
+    parent = list(range(n))
+    size = [1] * n
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for k in order:
+        a, b = find(int(first[k])), find(int(second[k]))
+        if a == b or size[a] + size[b] > max_cluster_size:
+            continue
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda c: c[0])
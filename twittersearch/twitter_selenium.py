@@ -2,38 +2,116 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+import argparse
+import os
 import time
 
-# Set up Chrome options
-chrome_options = Options()
-# Load unpacked MetaMask extension
-chrome_options.add_argument('--load-extension=/Users/lv/Library/Application Support/Google/Chrome/Default/Extensions/nkbihfbeogaeaoehlefnkodbefgpgknn')
+from browser_pool import (
+    BrowserPool,
+    build_chrome_options,
+    to_url,
+    wait_for_clickable,
+    wait_for_new_window,
+)
 
-# Initialize the driver with options
-driver = webdriver.Chrome(options=chrome_options)
+# Unpacked MetaMask extension (override with METAMASK_EXTENSION_PATH)
+METAMASK_EXTENSION_PATH = os.getenv(
+    'METAMASK_EXTENSION_PATH',
+    '/Users/lv/Library/Application Support/Google/Chrome/Default/Extensions/nkbihfbeogaeaoehlefnkodbefgpgknn'
+)
+
+PANCAKESWAP_URL = "https://pancakeswap.finance/info/token/0xF6c5449B7E2AB7f732fbc1d2346e6F9CB9704867"
+
+CONNECT_WALLET_BUTTON = (By.XPATH, "//button[contains(text(), 'Connect Wallet')]")
+METAMASK_OPTION = (By.XPATH, "//div[contains(text(), 'MetaMask')]")
+
+
+def connect_wallet(driver, url=PANCAKESWAP_URL, timeout=10):
+    """
+    Open `url` (a page URL or local HTML fixture), click Connect Wallet and
+    pick MetaMask. Returns the window handles that existed before the click,
+    so callers can wait for the wallet popup.
+    """
+    driver.get(to_url(url))
 
-try:
-    # Go to PancakeSwap
-    driver.get("https://pancakeswap.finance/info/token/0xF6c5449B7E2AB7f732fbc1d2346e6F9CB9704867")
-    
     # Wait for Connect Wallet button and click it
-    connect_wallet = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Connect Wallet')]"))
-    )
-    connect_wallet.click()
-    
+    wait_for_clickable(driver, CONNECT_WALLET_BUTTON, timeout).click()
+
     # Wait for wallet options and click MetaMask
-    metamask_option = WebDriverWait(driver, 10).until(
-        EC.element_to_be_clickable((By.XPATH, "//div[contains(text(), 'MetaMask')]"))
-    )
-    metamask_option.click()
-    
-    # Keep browser open for interaction
-    time.sleep(60)
-
-except Exception as e:
-    print(f"An error occurred: {str(e)}")
-
-finally:
-    driver.quit()
\ No newline at end of file
+    handles = set(driver.window_handles)
+    wait_for_clickable(driver, METAMASK_OPTION, timeout).click()
+    return handles
+
+
+def connect_wallet_task(driver, url):
+    """Pool task: run the connect flow and report the outcome for `url`"""
+    try:
+        connect_wallet(driver, url)
+        return url, "ok"
+    except TimeoutException:
+        return url, "timed out waiting for wallet buttons"
+
+
+def run_interactive(url, wait_seconds):
+    """Single headed browser with the extension, kept open while the user works in the wallet popup"""
+    options = build_chrome_options(headless=False, extension_path=METAMASK_EXTENSION_PATH,
+                                   block_assets=False)
+    driver = webdriver.Chrome(options=options)
+
+    try:
+        deadline = time.monotonic() + wait_seconds
+        handles = connect_wallet(driver, url)
+
+        # Wait for MetaMask to open its popup, then keep the browser open
+        # until the user closes it (or we give up)
+        popup = wait_for_new_window(driver, handles, timeout=wait_seconds)[0]
+        print("MetaMask window opened.")
+        driver.switch_to.window(popup)
+        remaining = max(0.0, deadline - time.monotonic())
+        try:
+            WebDriverWait(driver, remaining).until(EC.number_of_windows_to_be(len(handles)))
+            print("MetaMask window closed.")
+        except TimeoutException:
+            print(f"Gave up waiting after {wait_seconds} seconds.")
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+
+    finally:
+        driver.quit()
+
+
+def run_pool(urls, size, use_extension):
+    """Run the connect flow for every URL across a pool of warm headless browsers"""
+    extension_path = METAMASK_EXTENSION_PATH if use_extension else None
+    with BrowserPool(size=size, extension_path=extension_path) as pool:
+        results = pool.map(connect_wallet_task, urls, return_exceptions=True)
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                print(f"{url}: failed ({str(result)})")
+            else:
+                print(f"{url}: {result[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wallet connect automation")
+    parser.add_argument("urls", nargs="*", default=[PANCAKESWAP_URL],
+                        help="page URLs or local HTML files "
+                             "(e.g. twittersearch/fixtures/connect_wallet.html)")
+    parser.add_argument("--pool", type=int, default=0,
+                        help="run headless across a pool of this many browsers")
+    parser.add_argument("--no-extension", action="store_true",
+                        help="don't load MetaMask in pooled browsers")
+    parser.add_argument("--wait", type=int, default=60,
+                        help="seconds to keep the browser open for the MetaMask popup in interactive mode")
+    args = parser.parse_args()
+
+    if args.pool:
+        run_pool(args.urls, args.pool, not args.no_extension)
+    else:
+        run_interactive(args.urls[0], args.wait)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import requests
 import os
+import json
+import time
+import datetime
+import argparse
 from openai import OpenAI
 import dotenv
 
@@ -14,11 +18,23 @@ client = OpenAI(api_key=OPENAI_API_KEY)
 
 url = "https://apis.datura.ai/twitter"
 
-payload = {
-    "query": "from:cz_binance since:2025-02-07 until:2025-02-08",
+CHATGPT_MODEL = "chatgpt-4o-latest"
+SYSTEM_PROMPT = 'Answer if the tweet data include subscriber responses'
+
+# Upper bound on tweet data sent to ChatGPT per request (~4 characters per token)
+MAX_TOKENS_PER_CHUNK = 6000
+
+# Rate-limit handling: wait this long when the response has no Retry-After,
+# and give up on a window after this many 429s in a row for one page
+RATE_LIMIT_WAIT = 60
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Response keys the aggregator may use for the next-page cursor
+CURSOR_KEYS = ("next_cursor", "cursor", "next_token")
+
+# Base search filters; query and dates are filled in per date window
+SEARCH_FILTERS = {
     "sort": "Latest",
-    "start_date": "2025-02-07",
-    "end_date": "2025-02-08",
     "lang": "en",
     "verified": True,
     "blue_verified": False,
@@ -29,62 +45,278 @@ payload = {
     "min_replies": 1,
     "min_likes": 10
 }
-headers = {
-    "Authorization": "dt_$43jT5EUlAiSlu2mX2aehFioRonpIjvCmwnVbSQjL_E8",
-    "Content-Type": "application/json"
-}
 
-response = requests.request("POST", url, json=payload, headers=headers)
-
-# Add error handling
-if response.status_code != 200:
-    print(f"Error: {response.status_code}")
-    print(response.text)
-else:
-    # Print the raw response
-    print("\nTwitter API Response:")
-    print(response.text)
-    
-    tweets_data = response.json()
-    
-    # Filter and clean the tweet data
-    if isinstance(tweets_data, dict) and 'data' in tweets_data:
-        filtered_data = []
-        for tweet in tweets_data['data']:
-            filtered_tweet = {
-                'text': tweet.get('text', ''),
-                'username': tweet.get('username', ''),
-                'date': tweet.get('date', ''),
-                'likes': tweet.get('likes', 0),
-                'retweets': tweet.get('retweets', 0),
-                'replies': tweet.get('replies', 0)
+
+##########################
+# 1) Paginated search
+##########################
+def iter_date_windows(start_date, end_date, days_per_window=1):
+    """Yield (since, until) date pairs covering [start_date, end_date)"""
+    current = start_date
+    step = datetime.timedelta(days=days_per_window)
+    while current < end_date:
+        until = min(current + step, end_date)
+        yield current, until
+        current = until
+
+
+def filter_tweet(tweet):
+    """Keep only the fields the analysis needs"""
+    return {
+        'text': tweet.get('text', ''),
+        'username': tweet.get('username', ''),
+        'date': tweet.get('date', ''),
+        'likes': tweet.get('likes', 0),
+        'retweets': tweet.get('retweets', 0),
+        'replies': tweet.get('replies', 0)
+    }
+
+
+def _next_cursor(data):
+    if not isinstance(data, dict):
+        return None
+    for key in CURSOR_KEYS:
+        if data.get(key):
+            return data[key]
+    meta = data.get("meta")
+    if isinstance(meta, dict):
+        return _next_cursor(meta)
+    return None
+
+
+def _page_tweets(data):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return data.get('data') or data.get('results') or []
+    return []
+
+
+def _retry_after(response, default=RATE_LIMIT_WAIT):
+    try:
+        return max(1, int(response.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+def _warn_truncated(since_str, until_str, reason):
+    print(f"[WARN] {since_str}..{until_str}: {reason}, "
+          f"results for this window are truncated")
+
+
+def search_tweets(username, start_date, end_date, days_per_window=1, max_pages_per_window=50,
+                  max_rate_limit_retries=MAX_RATE_LIMIT_RETRIES):
+    """
+    Generator over filtered tweets from `username` between two dates.
+
+    The range is split into date windows and each window's result pages are
+    followed via the aggregator's cursor, so only one page is held in memory.
+    """
+    headers = {
+        "Authorization": TWITTER_API_KEY,
+        "Content-Type": "application/json"
+    }
+
+    for since, until in iter_date_windows(start_date, end_date, days_per_window):
+        since_str, until_str = since.isoformat(), until.isoformat()
+        cursor = None
+        seen_cursors = set()
+
+        page = 0
+        rate_limited = 0
+        while True:
+            if page >= max_pages_per_window:
+                _warn_truncated(since_str, until_str,
+                                f"stopped after {max_pages_per_window} pages (use a smaller --days-per-window)")
+                break
+
+            payload = dict(SEARCH_FILTERS)
+            payload.update({
+                "query": f"from:{username} since:{since_str} until:{until_str}",
+                "start_date": since_str,
+                "end_date": until_str
+            })
+            if cursor:
+                payload["cursor"] = cursor
+
+            response = requests.request("POST", url, json=payload, headers=headers)
+
+            if response.status_code == 429:  # Rate limit; retry the same page
+                rate_limited += 1
+                if rate_limited > max_rate_limit_retries:
+                    _warn_truncated(since_str, until_str,
+                                    f"still rate limited after {max_rate_limit_retries} retries")
+                    break
+                wait_time = _retry_after(response)
+                print(f"\nRate limit hit. Waiting {wait_time} seconds...")
+                time.sleep(wait_time)
+                continue
+            rate_limited = 0
+
+            # Add error handling
+            if response.status_code != 200:
+                print(f"Error: {response.status_code}")
+                print(response.text)
+                break
+
+            data = response.json()
+            tweets = _page_tweets(data)
+            page += 1
+            print(f"[SEARCH] {since_str}..{until_str} page {page}: {len(tweets)} tweets")
+            for tweet in tweets:
+                yield filter_tweet(tweet)
+
+            cursor = _next_cursor(data)
+            if not tweets or not cursor or cursor in seen_cursors:
+                break
+            seen_cursors.add(cursor)
+
+
+##########################
+# 2) Token-bounded chunks
+##########################
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def chunk_tweets(tweets, max_tokens=MAX_TOKENS_PER_CHUNK):
+    """Group a stream of tweets into lists whose JSON fits in `max_tokens`"""
+    chunk, chunk_tokens = [], 0
+    for tweet in tweets:
+        tokens = estimate_tokens(json.dumps(tweet))
+        if chunk and chunk_tokens + tokens > max_tokens:
+            yield chunk
+            chunk, chunk_tokens = [], 0
+        chunk.append(tweet)
+        chunk_tokens += tokens
+    if chunk:
+        yield chunk
+
+
+##########################
+# 3) Incremental analysis
+##########################
+def analyze_chunks(chunks):
+    """
+    Yield (batch number, tweet count, analysis) for each chunk as soon as it
+    is available; analysis is None when the ChatGPT call for that batch failed.
+    """
+    for i, chunk in enumerate(chunks, start=1):
+        # Create simple message for ChatGPT
+        chatgpt_messages = [
+            {
+                'role': 'system',
+                'content': SYSTEM_PROMPT
+            },
+            {
+                'role': 'user',
+                'content': json.dumps({'data': chunk})  # Send the filtered data to ChatGPT
             }
-            filtered_data.append(filtered_tweet)
-        tweets_data = {'data': filtered_data}
-    
-    # Create simple message for ChatGPT
-    chatgpt_messages = [
-        {
-            'role': 'system',
-            'content': 'Answer if the tweet data include subscriber responses'
-        },
-        {
-            'role': 'user',
-            'content': str(tweets_data)  # Send the filtered data to ChatGPT
-        }
-    ]
-
-    # Send to ChatGPT and get response
+        ]
+
+        # Send to ChatGPT and get response
+        try:
+            response = client.chat.completions.create(
+                model=CHATGPT_MODEL,
+                messages=chatgpt_messages
+            )
+            analysis = response.choices[0].message.content
+        except Exception as e:
+            print(f"Error calling ChatGPT API (batch {i}): {str(e)}")
+            analysis = None
+        yield i, len(chunk), analysis
+
+
+def _group_by_tokens(texts, max_tokens):
+    """Split texts into consecutive groups within `max_tokens`, at least two per group"""
+    groups, group, group_tokens = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if len(group) >= 2 and group_tokens + tokens > max_tokens:
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(text)
+        group_tokens += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+
+def _combine_group(partials):
     try:
         response = client.chat.completions.create(
-            model="chatgpt-4o-latest",
-            messages=chatgpt_messages
+            model=CHATGPT_MODEL,
+            messages=[
+                {
+                    'role': 'system',
+                    'content': SYSTEM_PROMPT + '. You are given analyses of consecutive batches '
+                               'of the same tweet data; combine them into one answer.'
+                },
+                {
+                    'role': 'user',
+                    'content': "\n\n".join(f"Batch {i}:\n{p}" for i, p in enumerate(partials, start=1))
+                }
+            ]
         )
-        
-        # Print ChatGPT's analysis
-        print("\nChatGPT Analysis:")
-        print(response.choices[0].message.content)
+        return response.choices[0].message.content
     except Exception as e:
         print(f"Error calling ChatGPT API: {str(e)}")
+        return "\n\n".join(partials)
+
+
+def combine_analyses(partials, max_tokens=MAX_TOKENS_PER_CHUNK):
+    """
+    Merge per-chunk answers into one final answer. Partials are combined in
+    groups that fit `max_tokens`, and the results combined again, until a
+    single answer remains.
+    """
+    while len(partials) > 1:
+        partials = [
+            group[0] if len(group) == 1 else _combine_group(group)
+            for group in _group_by_tokens(partials, max_tokens)
+        ]
+    return partials[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search an account's tweets and analyse them with ChatGPT")
+    parser.add_argument("--user", default="cz_binance")
+    parser.add_argument("--start", default="2025-02-07", help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", default="2025-02-08", help="YYYY-MM-DD (exclusive)")
+    parser.add_argument("--days-per-window", type=int, default=1)
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS_PER_CHUNK,
+                        help="approximate token budget of tweet data per ChatGPT request")
+    args = parser.parse_args()
+
+    start_date = datetime.date.fromisoformat(args.start)
+    end_date = datetime.date.fromisoformat(args.end)
+
+    tweets = search_tweets(args.user, start_date, end_date, args.days_per_window)
+    partials = []
+    batches, failed = 0, 0
+    for i, count, analysis in analyze_chunks(chunk_tweets(tweets, args.max_tokens)):
+        batches += 1
+        if analysis is None:
+            failed += 1
+            continue
+        # Print ChatGPT's analysis of each batch as it arrives
+        print(f"\nChatGPT Analysis (batch {i}, {count} tweets):")
+        print(analysis)
+        partials.append(analysis)
+
+    if not batches:
+        print("No tweets found.")
+        return
+    if failed == batches:
+        print(f"\n[ERROR] All {batches} batches failed; no analysis available")
+        return
+    if failed:
+        print(f"\n[WARN] {failed} of {batches} batches failed; "
+              f"analysis covers only the batches that succeeded")
+    if len(partials) > 1:
+        print("\nChatGPT Analysis (combined):")
+        print(combine_analyses(partials, args.max_tokens))
 
 
+if __name__ == "__main__":
+    main()